@@ -0,0 +1,124 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.config import (
+    ADMISSION_DB_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT, ADMISSION_RETRY_AFTER,
+    ADMISSION_ROUTE_CONCURRENCY,
+)
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class Overloaded(Exception):
+    """Запрос не допущен к БД: очередь переполнена или истекло время ожидания."""
+
+    def __init__(self, retry_after: int = ADMISSION_RETRY_AFTER):
+        super().__init__("Сервис перегружен, повторите запрос позже")
+        self.retry_after = retry_after
+
+
+class PriorityLimiter:
+    """
+    Ограничитель числа одновременных запросов с ограниченной очередью ожидания.
+    Освободившийся слот получает ожидающий запрос с наименьшим значением priority,
+    при равном приоритете - пришедший раньше.
+    """
+
+    def __init__(self, capacity: int, max_queue: int):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self._active = 0
+        self._queued = 0
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def try_acquire(self) -> bool:
+        """
+        Занимает свободный слот без ожидания.
+        Return: bool: True, если слот занят; False, если свободных слотов нет или есть очередь.
+        """
+        if self._active < self.capacity and not self._queued:
+            self._active += 1
+            return True
+        return False
+
+    async def acquire(self, priority: int, timeout: Optional[float]):
+        """
+        Занимает слот, при необходимости ожидая в очереди не дольше timeout секунд.
+        Raise: Overloaded, если очередь заполнена или слот не освободился вовремя.
+        """
+        if self.try_acquire():
+            return
+        if self._queued >= self.max_queue:
+            raise Overloaded()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # слот был передан в момент отмены ожидания - возвращаем его
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise Overloaded() from e
+            raise
+        finally:
+            self._queued -= 1
+
+    def release(self):
+        """Освобождает слот, передавая его первому живому ожидающему запросу."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+
+db_limiter = PriorityLimiter(ADMISSION_DB_CONCURRENCY, ADMISSION_MAX_QUEUE)
+route_limiters = {
+    route: PriorityLimiter(capacity, ADMISSION_MAX_QUEUE)
+    for route, capacity in ADMISSION_ROUTE_CONCURRENCY.items()
+}
+
+
+@asynccontextmanager
+async def admit(route: str, priority: int = PRIORITY_NORMAL):
+    """
+    Допускает запрос к БД: сначала по лимиту маршрута, затем по общему лимиту пула соединений.
+    Общее время ожидания ограничено ADMISSION_MAX_WAIT.
+    Raise: Overloaded, если запрос не допущен.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ADMISSION_MAX_WAIT
+    route_limiter = route_limiters.get(route)
+
+    if route_limiter is not None:
+        await route_limiter.acquire(priority, ADMISSION_MAX_WAIT)
+    try:
+        await db_limiter.acquire(priority, max(deadline - loop.time(), 0))
+        try:
+            yield
+        finally:
+            db_limiter.release()
+    finally:
+        if route_limiter is not None:
+            route_limiter.release()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Iterable, Optional
+
+from cache import redis_client
+
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "Spimex events:trading-dates"
+SUBSCRIBER_QUEUE_SIZE = 16
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 30
+
+
+class Broadcaster:
+    """
+    Рассылает события о новых торговых днях всем подключённым клиентам воркера.
+    На воркер приходится одна подписка Redis pub/sub, из которой события
+    раскладываются по очередям подписчиков (SSE и WebSocket соединений).
+    """
+
+    def __init__(self, channel: str = EVENTS_CHANNEL, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._subscribers: set[asyncio.Queue] = set()
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """
+        Запускает фоновое чтение событий.
+        Подписка на канал Redis выполняется в фоне и восстанавливается после обрыва соединения.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Останавливает чтение событий и отписывается от канала."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_pubsub()
+
+    async def _close_pubsub(self):
+        if self._pubsub is None:
+            return
+        pubsub, self._pubsub = self._pubsub, None
+        try:
+            await pubsub.aclose()
+        except Exception:
+            logger.debug("Failed to close Redis pub/sub", exc_info=True)
+
+    async def _listen(self):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(self.channel)
+                delay = RECONNECT_MIN_DELAY
+                async for message in self._pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        event = json.loads(message["data"])
+                    except ValueError:
+                        logger.warning("Skipping malformed event on %s: %r", self.channel, message["data"])
+                        continue
+                    self.dispatch(event)
+                raise ConnectionError("Redis pub/sub stream ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis subscription to %s failed, reconnecting in %s s", self.channel, delay)
+                await self._close_pubsub()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def dispatch(self, event: dict):
+        """
+        Кладёт событие в очередь каждого подписчика.
+        Если клиент не успевает читать, из его очереди вытесняется самое старое событие.
+        """
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self):
+        """
+        Регистрирует подписчика на время жизни соединения.
+        Yield: asyncio.Queue, в которую поступают события.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+
+broadcaster = Broadcaster()
+
+
+async def publish_trading_dates(dates: Iterable[date], revised: bool = False) -> int:
+    """
+    Публикует событие о новых (или исправленных, revised=True) торговых датах.
+    Return: int: количество воркеров, получивших событие.
+    """
+    event = {
+        "event": "revised" if revised else "published",
+        "dates": sorted(str(d) for d in dates),
+    }
+    return await redis_client.publish(EVENTS_CHANNEL, json.dumps(event))
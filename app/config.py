@@ -14,4 +14,27 @@ DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{D
 TEST_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 REDIS_URL = os.getenv("REDIS_URL")
-CACHE_TZ = os.getenv("CACHE_TZ")
\ No newline at end of file
+CACHE_TZ = os.getenv("CACHE_TZ")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+ADMISSION_DB_CONCURRENCY = int(os.getenv("ADMISSION_DB_CONCURRENCY", DB_POOL_SIZE + DB_MAX_OVERFLOW))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 100))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", 5))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 2))
+ADMISSION_ROUTE_CONCURRENCY = {
+    "/dynamics": int(os.getenv("ADMISSION_DYNAMICS_CONCURRENCY", 4)),
+    "/rankings": int(os.getenv("ADMISSION_RANKINGS_CONCURRENCY", 4)),
+}
+ADMISSION_SERVE_STALE = os.getenv("ADMISSION_SERVE_STALE", "true").lower() == "true"
+STALE_CACHE_TTL = int(os.getenv("STALE_CACHE_TTL", 3 * 24 * 60 * 60))
+
+DYNAMICS_MAX_ROWS = int(os.getenv("DYNAMICS_MAX_ROWS", 2_000_000))
+DYNAMICS_SPLIT_ROWS = int(os.getenv("DYNAMICS_SPLIT_ROWS", 100_000))
+DYNAMICS_PARALLELISM = int(os.getenv("DYNAMICS_PARALLELISM", 3))
+
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+SQL_COMPILED_CACHE_SIZE = int(os.getenv("SQL_COMPILED_CACHE_SIZE", 500))
+PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("PREPARED_STATEMENT_CACHE_SIZE", 100))
@@ -1,8 +1,67 @@
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import asyncio
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, delete, insert, func, union_all, bindparam, Integer
 
-from app.models import SpimexTradingResult
-from app.schemas import DynamicsRequest, TradingResultsRequest
+from app.admission import db_limiter
+from app.config import DYNAMICS_MAX_ROWS, DYNAMICS_SPLIT_ROWS, DYNAMICS_PARALLELISM
+from app.models import SpimexTradingResult, SpimexDailyProductTotal, SpimexTradingDay
+from app.schemas import DynamicsRequest, TradingResultsRequest, RankingRequest
+
+
+class QueryTooExpensive(Exception):
+    """Оценка числа просматриваемых строк превышает DYNAMICS_MAX_ROWS."""
+
+    def __init__(self, estimated_rows: int, max_rows: int = DYNAMICS_MAX_ROWS):
+        super().__init__(
+            f"Слишком широкий период: около {estimated_rows} строк при допустимых {max_rows}. "
+            f"Сократите период или укажите фильтры"
+        )
+        self.estimated_rows = estimated_rows
+        self.max_rows = max_rows
+
+
+FILTER_FIELDS = ("oil_id", "delivery_type_id", "delivery_basis_id")
+
+# Запросы собираются один раз и выполняются с параметрами: SQLAlchemy берёт
+# скомпилированный SQL из кэша по готовому ключу, asyncpg переиспользует
+# подготовленный на соединении запрос.
+LAST_DATES_STMT = (
+    select(SpimexTradingResult.date.distinct())
+    .order_by(SpimexTradingResult.date.desc())
+    .limit(bindparam("days", type_=Integer))
+)
+
+DAY_ROWS_STMT = (
+    select(SpimexTradingDay.date, SpimexTradingDay.rows)
+    .where(SpimexTradingDay.date >= bindparam("start_date"),
+           SpimexTradingDay.date <= bindparam("end_date"))
+    .order_by(SpimexTradingDay.date.asc())
+)
+
+
+@lru_cache(maxsize=None)
+def results_statement(filters: tuple[str, ...], descending: bool = False):
+    """
+    Возвращает заранее собранный запрос к spimex_trading_results за период
+    для набора активных фильтров (не больше 2 ** len(FILTER_FIELDS) вариантов на сортировку).
+    Параметры: start_date, end_date, limit и значения фильтров.
+    """
+    order = SpimexTradingResult.date.desc() if descending else SpimexTradingResult.date.asc()
+    q = select(SpimexTradingResult).where(
+        SpimexTradingResult.date >= bindparam("start_date"),
+        SpimexTradingResult.date <= bindparam("end_date"),
+        *(getattr(SpimexTradingResult, name) == bindparam(name) for name in filters),
+    )
+    return q.order_by(order).limit(bindparam("limit", type_=Integer))
+
+
+def _filter_params(
+        request: Union[DynamicsRequest, TradingResultsRequest, RankingRequest]) -> tuple[tuple[str, ...], dict]:
+    filters = tuple(name for name in FILTER_FIELDS if getattr(request, name))
+    return filters, {name: getattr(request, name) for name in filters}
 
 
 async def get_last_trading_dates(days: int, db: AsyncSession):
@@ -10,36 +69,129 @@ async def get_last_trading_dates(days: int, db: AsyncSession):
     Получает список дат последних торгов.
     Return: List[datetime]: список дат.
     """
-    q = (
-        select(SpimexTradingResult.date.distinct())
-        .order_by(SpimexTradingResult.date.desc())
-        .limit(days)
-    )
-    result = await db.execute(q)
+    result = await db.execute(LAST_DATES_STMT, {"days": days})
     return [r[0] for r in result.all()]
 
 
-async def get_dynamics(request: DynamicsRequest, db: AsyncSession):
+async def get_day_rows(start_date: date, end_date: date, db: AsyncSession):
+    """
+    Получает количество строк за каждый торговый день периода из spimex_trading_days.
+    Return: List[Tuple[date, int]]: пары (дата, количество строк) по возрастанию даты.
+    """
+    result = await db.execute(DAY_ROWS_STMT, {"start_date": start_date, "end_date": end_date})
+    return [(r[0], r[1]) for r in result.all()]
+
+
+def plan_dynamics(request: DynamicsRequest, day_rows: list[tuple[date, int]]) -> list[tuple[date, date]]:
+    """
+    Выбирает стратегию выполнения get_dynamics по оценке числа строк за дни периода.
+    1. Без статистики или при небольшой оценке - один запрос за весь период.
+    2. Без фильтров - период сужается до первых дней, которых хватает на limit.
+    3. С фильтрами и оценкой выше DYNAMICS_MAX_ROWS - запрос отклоняется.
+    4. С фильтрами и оценкой выше DYNAMICS_SPLIT_ROWS - период делится на календарные месяцы,
+       в которых есть строки; последний подзапрос продлевается до конца периода, чтобы
+       не пропустить дни, ещё не учтённые в spimex_trading_days.
+    Return: List[Tuple[date, date]]: периоды подзапросов по возрастанию даты.
+    Raise: QueryTooExpensive.
+    """
+    whole = [(request.start_date, request.end_date)]
+    if not day_rows:
+        return whole
+
+    filtered = request.oil_id or request.delivery_type_id or request.delivery_basis_id
+    if not filtered:
+        seen = 0
+        for trading_date, rows in day_rows:
+            seen += rows
+            if seen >= request.limit:
+                return [(request.start_date, trading_date)]
+        return whole
+
+    estimated = sum(rows for _, rows in day_rows)
+    if estimated > DYNAMICS_MAX_ROWS:
+        raise QueryTooExpensive(estimated)
+    if estimated <= DYNAMICS_SPLIT_ROWS:
+        return whole
+
+    ranges = []
+    for trading_date, _ in day_rows:
+        if ranges and trading_date <= ranges[-1][1]:
+            continue
+        month_start = trading_date.replace(day=1)
+        next_month = date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+        ranges.append((max(month_start, request.start_date), min(next_month - timedelta(days=1), request.end_date)))
+    ranges[-1] = (ranges[-1][0], request.end_date)
+    return ranges
+
+
+async def _fetch_dynamics(request: DynamicsRequest, start_date: date, end_date: date, limit: int, db: AsyncSession):
+    filters, params = _filter_params(request)
+    params.update(start_date=start_date, end_date=end_date, limit=limit)
+    result = await db.execute(results_statement(filters), params)
+    return result.scalars().all()
+
+
+async def _fetch_dynamics_in_session(
+        request: DynamicsRequest, start_date: date, end_date: date, limit: int, session_factory: async_sessionmaker):
+    async with session_factory() as db:
+        return await _fetch_dynamics(request, start_date, end_date, limit, db)
+
+
+async def get_dynamics(request: DynamicsRequest, db: AsyncSession, session_factory: Optional[async_sessionmaker] = None):
     """
     Получает результаты торгов за указанный период.
+    План выполнения выбирается plan_dynamics. Помесячные подзапросы выполняются
+    волнами в отдельных сессиях из session_factory (без неё - последовательно в db),
+    пока не наберётся limit строк.
+
+    Вызывающий код держит один слот db_limiter (admit). Перед волнами соединение db
+    возвращается в пул, и этот слот достаётся первому подзапросу волны. Для остальных
+    (до DYNAMICS_PARALLELISM - 1) слоты занимаются без ожидания. Если свободных слотов нет,
+    подзапросы идут по одному, так что число соединений не превышает число занятых слотов.
     Return: List[SpimexTradingResult]: Список ORM-объектов с результатами торгов.
+    Raise: QueryTooExpensive.
     """
-    q = (
-        select(SpimexTradingResult)
-        .where(SpimexTradingResult.date >= request.start_date,
-               SpimexTradingResult.date <= request.end_date)
-        .order_by(SpimexTradingResult.date.asc())
-        .limit(request.limit)
-    )
-    if request.oil_id:
-        q = q.where(SpimexTradingResult.oil_id == request.oil_id)
-    if request.delivery_type_id:
-        q = q.where(SpimexTradingResult.delivery_type_id == request.delivery_type_id)
-    if request.delivery_basis_id:
-        q = q.where(SpimexTradingResult.delivery_basis_id == request.delivery_basis_id)
+    day_rows = await get_day_rows(request.start_date, request.end_date, db)
+    ranges = plan_dynamics(request, day_rows)
+    if len(ranges) == 1:
+        start_date, end_date = ranges[0]
+        return await _fetch_dynamics(request, start_date, end_date, request.limit, db)
 
-    result = await db.execute(q)
-    return result.scalars().all()
+    results = []
+    if not session_factory:
+        for start_date, end_date in ranges:
+            results.extend(await _fetch_dynamics(request, start_date, end_date, request.limit - len(results), db))
+            if len(results) >= request.limit:
+                break
+        return results[:request.limit]
+
+    await db.close()
+    extra_slots = 0
+    while extra_slots < DYNAMICS_PARALLELISM - 1 and db_limiter.try_acquire():
+        extra_slots += 1
+    wave_size = 1 + extra_slots
+    try:
+        for i in range(0, len(ranges), wave_size):
+            remaining = request.limit - len(results)
+            # при ошибке подзапроса TaskGroup отменяет остальные подзапросы волны
+            # и дожидается их до освобождения слотов
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [
+                        tg.create_task(
+                            _fetch_dynamics_in_session(request, start_date, end_date, remaining, session_factory))
+                        for start_date, end_date in ranges[i:i + wave_size]
+                    ]
+            except ExceptionGroup as e:
+                raise e.exceptions[0]
+            for task in tasks:
+                results.extend(task.result())
+            if len(results) >= request.limit:
+                break
+    finally:
+        for _ in range(extra_slots):
+            db_limiter.release()
+    return results[:request.limit]
 
 
 async def get_trading_results(request: TradingResultsRequest, db: AsyncSession):
@@ -47,33 +199,136 @@ async def get_trading_results(request: TradingResultsRequest, db: AsyncSession):
     Получает результаты торгов за после дни (days).
     Return: List[SpimexTradingResult]: Список ORM-объектов с результатами торгов.
     """
-    dates_q = (
-        select(SpimexTradingResult.date.distinct())
-        .order_by(SpimexTradingResult.date.desc())
-        .limit(request.days)
-    )
-    last_dates = await db.execute(dates_q)
+    last_dates = await db.execute(LAST_DATES_STMT, {"days": request.days})
     last_dates_res = [r[0] for r in last_dates.all()]
 
     if not last_dates_res:
         return []
 
-    min_date = min(last_dates_res)
-    max_date = max(last_dates_res)
+    filters, params = _filter_params(request)
+    params.update(start_date=min(last_dates_res), end_date=max(last_dates_res), limit=request.limit)
+    result = await db.execute(results_statement(filters, descending=True), params)
+    return result.scalars().all()
 
-    q = select(SpimexTradingResult).where(
-        SpimexTradingResult.date >= min_date,
-        SpimexTradingResult.date <= max_date
+
+async def refresh_daily_totals(trading_date: date, db: AsyncSession):
+    """
+    Пересчитывает суммы торгов по инструментам за торговый день
+    в таблице spimex_daily_product_totals.
+    """
+    raw = SpimexTradingResult
+    daily = (
+        select(
+            raw.date,
+            raw.exchange_product_id,
+            func.max(raw.exchange_product_name),
+            func.max(raw.oil_id),
+            func.max(raw.delivery_basis_id),
+            func.max(raw.delivery_type_id),
+            func.sum(raw.volume),
+            func.sum(raw.total),
+            func.sum(raw.count),
+        )
+        .where(raw.date == trading_date)
+        .group_by(raw.date, raw.exchange_product_id)
+    )
+    await db.execute(delete(SpimexDailyProductTotal).where(SpimexDailyProductTotal.date == trading_date))
+    await db.execute(
+        insert(SpimexDailyProductTotal).from_select(
+            ["date", "exchange_product_id", "exchange_product_name", "oil_id", "delivery_basis_id",
+             "delivery_type_id", "volume", "total", "count"],
+            daily,
+        )
+    )
+    await db.commit()
+
+
+def _ranking_source(model, request: RankingRequest):
+    q = select(
+        model.exchange_product_id,
+        model.exchange_product_name,
+        model.oil_id,
+        model.delivery_basis_id,
+        model.delivery_type_id,
+        model.volume,
+        model.total,
+        model.count,
     )
+    _, params = _filter_params(request)
+    return q.where(
+        model.date >= request.start_date,
+        model.date <= request.end_date,
+        *(getattr(model, name) == value for name, value in params.items()),
+    )
+
 
-    if request.oil_id:
-        q = q.where(SpimexTradingResult.oil_id == request.oil_id)
-    if request.delivery_type_id:
-        q = q.where(SpimexTradingResult.delivery_type_id == request.delivery_type_id)
-    if request.delivery_basis_id:
-        q = q.where(SpimexTradingResult.delivery_basis_id == request.delivery_basis_id)
+async def get_rankings(request: RankingRequest, db: AsyncSession):
+    """
+    Получает top-N инструментов по метрике (volume, total, count) за период,
+    опционально в разрезе partition_by (top-N внутри каждой группы).
 
-    q = q.order_by(SpimexTradingResult.date.desc()).limit(request.limit)
+    Даты, для которых есть предрассчитанные суммы, берутся из spimex_daily_product_totals,
+    остальные агрегируются из spimex_trading_results, поэтому результат всегда полный.
+    Return: List[RowMapping]: строки рейтинга с полем rank.
+    """
+    daily = SpimexDailyProductTotal
+    covered_dates = (
+        select(daily.date)
+        .where(daily.date >= request.start_date, daily.date <= request.end_date)
+        .distinct()
+    )
+    source = union_all(
+        _ranking_source(daily, request),
+        _ranking_source(SpimexTradingResult, request).where(SpimexTradingResult.date.not_in(covered_dates)),
+    ).subquery()
+
+    totals = (
+        select(
+            source.c.exchange_product_id,
+            func.max(source.c.exchange_product_name).label("exchange_product_name"),
+            source.c.oil_id,
+            source.c.delivery_basis_id,
+            source.c.delivery_type_id,
+            func.sum(source.c.volume).label("volume"),
+            func.sum(source.c.total).label("total"),
+            func.sum(source.c.count).label("count"),
+        )
+        .group_by(
+            source.c.exchange_product_id,
+            source.c.oil_id,
+            source.c.delivery_basis_id,
+            source.c.delivery_type_id,
+        )
+        .subquery()
+    )
+
+    partition = totals.c[request.partition_by] if request.partition_by else None
+    metric = totals.c[request.metric]
+    ranked = select(
+        totals,
+        func.row_number().over(
+            partition_by=partition,
+            order_by=(metric.desc(), totals.c.exchange_product_id),
+        ).label("rank"),
+    ).subquery()
+
+    q = select(ranked).where(ranked.c.rank <= request.top)
+    if request.partition_by:
+        q = q.order_by(ranked.c[request.partition_by], ranked.c.rank)
+    else:
+        q = q.order_by(ranked.c.rank)
 
     result = await db.execute(q)
-    return result.scalars().all()
\ No newline at end of file
+    return result.mappings().all()
+
+
+async def refresh_trading_day(trading_date: date, db: AsyncSession):
+    """
+    Пересчитывает количество строк spimex_trading_results за торговый день
+    в таблице spimex_trading_days.
+    """
+    rows = await db.scalar(select(func.count()).where(SpimexTradingResult.date == trading_date))
+    await db.execute(delete(SpimexTradingDay).where(SpimexTradingDay.date == trading_date))
+    if rows:
+        db.add(SpimexTradingDay(date=trading_date, rows=rows))
+    await db.commit()
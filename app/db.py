@@ -1,19 +1,28 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
-from app.config import DATABASE_URL
+from app.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_ECHO, SQL_COMPILED_CACHE_SIZE, PREPARED_STATEMENT_CACHE_SIZE,
+)
 
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=DB_ECHO,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    query_cache_size=SQL_COMPILED_CACHE_SIZE,
+    connect_args={"prepared_statement_cache_size": PREPARED_STATEMENT_CACHE_SIZE},
+)
 async_session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 
-async def get_async_db() -> AsyncSession:
+def get_session_factory() -> async_sessionmaker:
     """
-    Зависимость для получения асинхронной сессии SQLAlchemy.
-    Yield: асинхронная сессия для выполнения запросов к БД.
+    Зависимость для получения фабрики сессий.
+    Эндпоинты открывают сессию внутри допуска контроля нагрузки, а запросы
+    с параллельными подзапросами - отдельные сессии на каждый подзапрос.
     """
-    async with async_session() as session:
-        yield session
+    return async_session
 
 
 Base = declarative_base()
\ No newline at end of file
@@ -1,11 +1,24 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.routers import trading
+from app.broadcast import broadcaster
+from app.routers import trading, events, snapshots
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await broadcaster.start()
+    yield
+    await broadcaster.stop()
+
 
-app = FastAPI(title="SPIMEX Trading API")
+app = FastAPI(title="SPIMEX Trading API", lifespan=lifespan)
 
 app.include_router(trading.router)
+app.include_router(events.router)
+app.include_router(snapshots.router)
 
 
 @app.get("/")
 def root():
-    return {"message": "FastAPI for Effective Mobile"}
\ No newline at end of file
+    return {"message": "FastAPI for Effective Mobile"}
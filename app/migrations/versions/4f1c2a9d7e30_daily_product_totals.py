@@ -0,0 +1,47 @@
+"""Daily product totals
+
+Revision ID: 4f1c2a9d7e30
+Revises: b782d21078c6
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1c2a9d7e30'
+down_revision: Union[str, Sequence[str], None] = 'b782d21078c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('spimex_daily_product_totals',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('exchange_product_id', sa.String(length=50), nullable=False),
+    sa.Column('exchange_product_name', sa.String(length=255), nullable=False),
+    sa.Column('oil_id', sa.String(length=10), nullable=False),
+    sa.Column('delivery_basis_id', sa.String(length=10), nullable=False),
+    sa.Column('delivery_type_id', sa.String(length=10), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('date', 'exchange_product_id')
+    )
+    op.execute(
+        "INSERT INTO spimex_daily_product_totals "
+        "(date, exchange_product_id, exchange_product_name, oil_id, delivery_basis_id, delivery_type_id, "
+        "volume, total, count) "
+        "SELECT date, exchange_product_id, max(exchange_product_name), max(oil_id), max(delivery_basis_id), "
+        "max(delivery_type_id), sum(volume), sum(total), sum(count) "
+        "FROM spimex_trading_results GROUP BY date, exchange_product_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('spimex_daily_product_totals')
@@ -0,0 +1,36 @@
+"""Trading days row counts
+
+Revision ID: 9a3e5b7c1d42
+Revises: 4f1c2a9d7e30
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3e5b7c1d42'
+down_revision: Union[str, Sequence[str], None] = '4f1c2a9d7e30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('spimex_trading_days',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('date')
+    )
+    op.execute(
+        "INSERT INTO spimex_trading_days (date, rows) "
+        "SELECT date, count(*) FROM spimex_trading_results GROUP BY date"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('spimex_trading_days')
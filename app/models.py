@@ -22,4 +22,33 @@ class SpimexTradingResult(Base):
     count: Mapped[int] = mapped_column(Integer, nullable=False)
     date: Mapped[date] = mapped_column(Date, index=True, nullable=False)
     created_on: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    updated_on: Mapped[datetime] = mapped_column(DateTime, nullable=False)
\ No newline at end of file
+    updated_on: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class SpimexDailyProductTotal(Base):
+    """
+    ORM-модель таблицы spimex_daily_product_totals.
+    Предрассчитанные суммы торгов по инструменту за торговый день для рейтингов.
+    """
+    __tablename__ = "spimex_daily_product_totals"
+
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    exchange_product_id: Mapped[str] = mapped_column(String(50), primary_key=True)
+    exchange_product_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    oil_id: Mapped[str] = mapped_column(String(10), nullable=False)
+    delivery_basis_id: Mapped[str] = mapped_column(String(10), nullable=False)
+    delivery_type_id: Mapped[str] = mapped_column(String(10), nullable=False)
+    volume: Mapped[float] = mapped_column(Float, nullable=False)
+    total: Mapped[float] = mapped_column(Float, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class SpimexTradingDay(Base):
+    """
+    ORM-модель таблицы spimex_trading_days.
+    Количество строк spimex_trading_results за торговый день для оценки стоимости запросов.
+    """
+    __tablename__ = "spimex_trading_days"
+
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    rows: Mapped[int] = mapped_column(Integer, nullable=False)
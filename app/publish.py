@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+from datetime import date
+from typing import Iterable
+
+from app.broadcast import publish_trading_dates
+from app.crud import refresh_daily_totals, refresh_trading_day
+from app.db import async_session
+from app.snapshots import write_snapshot
+from cache import cache_clear, redis_client
+
+
+async def publish_trading_day(dates: Iterable[date], revised: bool = False):
+    """
+    Шаги после загрузки торгового дня в БД:
+    1. Пересчитывает статистику дня (число строк) и суммы по инструментам для рейтингов.
+    2. Записывает снапшоты дней в архив (исправленные дни перезаписываются).
+    3. Сбрасывает кэш ответов, чтобы клиенты не получили устаревшие данные.
+    4. Рассылает подписчикам событие о новых (или исправленных) датах.
+    Если за дату нет строк (загрузка не закоммичена или дата указана неверно),
+    write_snapshot выбрасывает EmptySnapshot и публикация прерывается до сброса кэша.
+    """
+    dates = list(dates)
+    async with async_session() as db:
+        for trading_date in dates:
+            await refresh_trading_day(trading_date, db)
+            await refresh_daily_totals(trading_date, db)
+            await write_snapshot(trading_date, db, overwrite=revised)
+    await cache_clear()
+    await publish_trading_dates(dates, revised=revised)
+
+
+def main():
+    """
+    Точка входа для загрузчика бюллетеней:
+    python -m app.publish 2025-09-13 [--revised]
+    """
+    parser = argparse.ArgumentParser(description="Публикация загруженных торговых дней")
+    parser.add_argument("dates", nargs="+", type=date.fromisoformat, help="Торговые даты (YYYY-MM-DD)")
+    parser.add_argument("--revised", action="store_true", help="Даты были исправлены, а не добавлены")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            await publish_trading_day(args.dates, revised=args.revised)
+        finally:
+            await redis_client.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+from datetime import date
+
+from fastapi import APIRouter, Depends, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.admission import admit, Overloaded, PRIORITY_NORMAL
+from app.broadcast import broadcaster
+from app.config import ADMISSION_SERVE_STALE
+from app.crud import get_dynamics, QueryTooExpensive
+from app.db import async_session
+from app.schemas import TradingEventsRequest, DynamicsRequest, TradingResultsResponse
+from cache import cache_get, cache_get_stale, cache_set, make_cache_key
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/trading/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+async def _load_results(request: DynamicsRequest, key: str) -> tuple[list, bool]:
+    """
+    Загружает результаты из кэша или из БД после допуска по лимиту /dynamics.
+    Return: (результаты, признак устаревших данных).
+    Raise: Overloaded, если БД перегружена и сохранённого значения нет;
+    QueryTooExpensive, если запрос отклонён планировщиком.
+    """
+    cached = await cache_get(key)
+    if cached:
+        return cached, False
+
+    try:
+        async with admit("/dynamics", PRIORITY_NORMAL):
+            async with async_session() as db:
+                orm_result = await get_dynamics(request, db, async_session)
+                result = [TradingResultsResponse.model_validate(r).model_dump(mode="json") for r in orm_result]
+    except Overloaded:
+        stale = await cache_get_stale(key) if ADMISSION_SERVE_STALE else None
+        if stale is None:
+            raise
+        return stale, True
+
+    await cache_set(key, result)
+    return result, False
+
+
+async def _results_for_date(trading_date: date, events: TradingEventsRequest) -> tuple[list, bool]:
+    """
+    Получает результаты торгов за одну дату с фильтрами подписчика.
+    Ключ кэша совпадает с ключом /trading/dynamics, а одновременные запросы
+    подписчиков с одинаковыми фильтрами выполняются одним обращением к БД.
+    """
+    request = DynamicsRequest(
+        start_date=trading_date,
+        end_date=trading_date,
+        oil_id=events.oil_id,
+        delivery_type_id=events.delivery_type_id,
+        delivery_basis_id=events.delivery_basis_id,
+        limit=events.limit,
+    )
+    key = make_cache_key("/dynamics", request.model_dump(mode="json"))
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_load_results(request, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _results_for_event(event: dict, events: TradingEventsRequest) -> tuple[list, bool]:
+    """
+    Получает результаты торгов за даты события. Каждая дата загружается отдельно,
+    поэтому limit не отсекает поздние даты исправления, разнесённые во времени.
+    Return: (результаты по датам в порядке возрастания, признак устаревших данных).
+    """
+    dates = sorted({date.fromisoformat(d) for d in event["dates"]})
+    loaded = await asyncio.gather(*(_results_for_date(d, events) for d in dates))
+    results = [row for rows, _ in loaded for row in rows]
+    return results, any(stale for _, stale in loaded)
+
+
+async def _build_payload(event: dict, events: TradingEventsRequest) -> dict:
+    """
+    Собирает сообщение для подписчика. При перегрузке БД вместо results
+    передаётся results_error с подсказкой retry_after, при слишком дорогом запросе
+    (QueryTooExpensive) и прочих ошибках загрузки - results_error без подсказки;
+    подписка при этом не прерывается.
+    Устаревшие результаты помечаются results_stale.
+    """
+    payload = dict(event)
+    if events.with_results and event["dates"]:
+        try:
+            results, stale = await _results_for_event(event, events)
+        except Overloaded as e:
+            payload["results_error"] = {"detail": str(e), "retry_after": e.retry_after}
+            return payload
+        except QueryTooExpensive as e:
+            payload["results_error"] = {"detail": str(e)}
+            return payload
+        except Exception:
+            logger.exception("Failed to load results for trading event %s", event)
+            payload["results_error"] = {"detail": "Не удалось загрузить результаты торгов"}
+            return payload
+        payload["results"] = results
+        if stale:
+            payload["results_stale"] = True
+    return payload
+
+
+async def _sse_stream(request: Request, events: TradingEventsRequest):
+    async with broadcaster.subscribe() as queue:
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            payload = await _build_payload(event, events)
+            data = json.dumps(payload, ensure_ascii=False, default=str)
+            yield f"event: {payload['event']}\ndata: {data}\n\n"
+
+
+@router.get("")
+async def trading_events_sse(request: Request, events: TradingEventsRequest = Depends()):
+    """
+    Поток Server-Sent Events о новых и исправленных торговых датах.
+    События: published (новый бюллетень) и revised (исправление опубликованных дат).
+    Return: text/event-stream с JSON-событиями {"event", "dates"[, "results" | "results_error"]}.
+    """
+    return StreamingResponse(
+        _sse_stream(request, events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _ws_send_events(websocket: WebSocket, events: TradingEventsRequest):
+    async with broadcaster.subscribe() as queue:
+        while True:
+            event = await queue.get()
+            await websocket.send_json(await _build_payload(event, events))
+
+
+async def _ws_wait_disconnect(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/ws")
+async def trading_events_ws(websocket: WebSocket, events: TradingEventsRequest = Depends()):
+    """
+    WebSocket-канал о новых и исправленных торговых датах.
+    Формат сообщений совпадает с SSE-событиями эндпоинта /trading/events.
+    Если отправка событий завершилась ошибкой, соединение закрывается с кодом 1011.
+    """
+    await websocket.accept()
+    sender = asyncio.create_task(_ws_send_events(websocket, events))
+    receiver = asyncio.create_task(_ws_wait_disconnect(websocket))
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    error = sender.exception() if sender in done else None
+    if error is not None and not isinstance(error, WebSocketDisconnect):
+        logger.error("Trading events WebSocket sender failed", exc_info=error)
+        try:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        except Exception:
+            # клиент уже отключился
+            pass
@@ -0,0 +1,57 @@
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Annotated
+
+from app.snapshots import load_manifest, snapshot_path, snapshot_dates, iter_range_stream
+
+
+router = APIRouter(prefix="/trading/snapshots", tags=["snapshots"])
+
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+@router.get("")
+async def snapshots_manifest():
+    """
+    Получает манифест архива снапшотов торговых дней.
+    Return: Dict[str, Dict]: дата -> файл, количество строк, размер и sha256.
+    """
+    return load_manifest()
+
+
+@router.get("/range")
+async def snapshots_range(
+        start_date: Annotated[date, Query(description="Начало периода (YYYY-MM-DD)")],
+        end_date: Annotated[date, Query(description="Конец периода (YYYY-MM-DD)")]):
+    """
+    Отдаёт снапшоты всех торговых дней периода одним потоком Arrow IPC (stream format).
+    Return: application/vnd.apache.arrow.stream.
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date должен быть раньше end_date")
+
+    dates = snapshot_dates(start_date, end_date)
+    if not dates:
+        raise HTTPException(status_code=404, detail="Снапшоты за период не найдены")
+
+    filename = f"spimex_{start_date.isoformat()}_{end_date.isoformat()}.arrows"
+    return StreamingResponse(
+        iter_range_stream(dates),
+        media_type=ARROW_STREAM_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/{trading_date}")
+async def snapshot_file(trading_date: date):
+    """
+    Отдаёт снапшот торгового дня файлом Arrow IPC (file format), пригодным для memory map.
+    Return: application/vnd.apache.arrow.file.
+    """
+    path = snapshot_path(trading_date)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Снапшот торгового дня не найден")
+    return FileResponse(path, media_type=ARROW_FILE_MEDIA_TYPE, filename=path.name)
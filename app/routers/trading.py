@@ -1,19 +1,56 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Annotated
-from app.db import get_async_db
-from app.crud import get_last_trading_dates, get_dynamics, get_trading_results
-from app.schemas import TradingResultsResponse, TradingDatesResponse, DynamicsRequest, TradingResultsRequest
-from cache import cache_get, cache_set, make_cache_key
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Annotated, Awaitable, Callable
+from app.admission import admit, Overloaded, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from app.config import ADMISSION_SERVE_STALE
+from app.db import get_session_factory
+from app.crud import get_last_trading_dates, get_dynamics, get_trading_results, get_rankings, QueryTooExpensive
+from app.schemas import (
+    TradingResultsResponse, TradingDatesResponse, DynamicsRequest, TradingResultsRequest,
+    RankingRequest, RankingResponse,
+)
+from cache import cache_get, cache_get_stale, cache_set, make_cache_key
 
 
 router = APIRouter(prefix="/trading", tags=["trading"])
 
+WIDE_RANGE_DAYS = 31
+
+
+async def load_admitted(
+        key: str,
+        route: str,
+        priority: int,
+        response: Response,
+        session_factory: async_sessionmaker,
+        loader: Callable[[AsyncSession], Awaitable]):
+    """
+    Выполняет loader (обращение к БД) после допуска контролем нагрузки и кэширует результат.
+    Сессия открывается и закрывается внутри допуска, поэтому соединение пула
+    возвращается до освобождения слота.
+    Если БД перегружена, отдаёт последнее сохранённое значение (заголовок X-Cache-Stale)
+    или 503 с заголовком Retry-After.
+    """
+    try:
+        async with admit(route, priority):
+            async with session_factory() as db:
+                result = await loader(db)
+    except Overloaded as e:
+        stale = await cache_get_stale(key) if ADMISSION_SERVE_STALE else None
+        if stale is not None:
+            response.headers["X-Cache-Stale"] = "1"
+            return stale
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    await cache_set(key, result)
+    return result
+
 
 @router.get("/last-dates", response_model=TradingDatesResponse)
 async def last_trading_dates(
+        response: Response,
         days: Annotated[int, Query(gt=0, le=365, description="Количество последних дат")] = 1,
-        db: AsyncSession = Depends(get_async_db)):
+        session_factory: async_sessionmaker = Depends(get_session_factory)):
     """
     Получает список дат последних торгов.
 
@@ -28,15 +65,18 @@ async def last_trading_dates(
     if cached:
         return cached
 
-    dates = await get_last_trading_dates(days, db)
-    result = {"dates": dates}
+    async def load(db: AsyncSession):
+        dates = await get_last_trading_dates(days, db)
+        return {"dates": dates}
 
-    await cache_set(key, result)
-    return result
+    return await load_admitted(key, "/last-dates", PRIORITY_HIGH, response, session_factory, load)
 
 
 @router.get("/dynamics", response_model=List[TradingResultsResponse])
-async def dynamics(request: DynamicsRequest = Depends(), db: AsyncSession = Depends(get_async_db)):
+async def dynamics(
+        response: Response,
+        request: DynamicsRequest = Depends(),
+        session_factory: async_sessionmaker = Depends(get_session_factory)):
     """
     Получает результаты торгов за указанный период.
     Return: List[TradingResultsResponse]: Список Pydantic объектов с результатами торгов.
@@ -57,15 +97,23 @@ async def dynamics(request: DynamicsRequest = Depends(), db: AsyncSession = Depe
     if cached:
         return cached
 
-    orm_result = await get_dynamics(request, db)
-    result = [TradingResultsResponse.model_validate(r).model_dump() for r in orm_result]
+    async def load(db: AsyncSession):
+        try:
+            orm_result = await get_dynamics(request, db, session_factory)
+        except QueryTooExpensive as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return [TradingResultsResponse.model_validate(r).model_dump() for r in orm_result]
 
-    await cache_set(key, result)
-    return result
+    wide = (request.end_date - request.start_date).days > WIDE_RANGE_DAYS
+    priority = PRIORITY_LOW if wide else PRIORITY_NORMAL
+    return await load_admitted(key, "/dynamics", priority, response, session_factory, load)
 
 
 @router.get("/results", response_model=List[TradingResultsResponse])
-async def trading_results(request: TradingResultsRequest = Depends(), db: AsyncSession = Depends(get_async_db)):
+async def trading_results(
+        response: Response,
+        request: TradingResultsRequest = Depends(),
+        session_factory: async_sessionmaker = Depends(get_session_factory)):
     """
     Получает результаты торгов за после дни (days).
     Return: List[TradingResultsResponse]: Список Pydantic объектов с результатами торгов.
@@ -82,8 +130,34 @@ async def trading_results(request: TradingResultsRequest = Depends(), db: AsyncS
     if cached:
         return cached
 
-    orm_result = await get_trading_results(request, db)
-    result = [TradingResultsResponse.model_validate(r).model_dump() for r in orm_result]
+    async def load(db: AsyncSession):
+        orm_result = await get_trading_results(request, db)
+        return [TradingResultsResponse.model_validate(r).model_dump() for r in orm_result]
 
-    await cache_set(key, result)
-    return result
\ No newline at end of file
+    return await load_admitted(key, "/results", PRIORITY_NORMAL, response, session_factory, load)
+
+
+@router.get("/rankings", response_model=List[RankingResponse])
+async def rankings(
+        response: Response,
+        request: RankingRequest = Depends(),
+        session_factory: async_sessionmaker = Depends(get_session_factory)):
+    """
+    Получает top-N инструментов по volume, total или count за указанный период.
+    Рейтинг считается в БД, поэтому не зависит от ограничения limit у /dynamics.
+    Return: List[RankingResponse]: Список мест рейтинга.
+    """
+    if request.start_date > request.end_date:
+        raise HTTPException(status_code=400, detail="start_date должен быть раньше end_date")
+
+    params = request.model_dump(mode="json")
+    key = make_cache_key("/rankings", params)
+    cached = await cache_get(key)
+    if cached:
+        return cached
+
+    async def load(db: AsyncSession):
+        rows = await get_rankings(request, db)
+        return [RankingResponse.model_validate(dict(r)).model_dump() for r in rows]
+
+    return await load_admitted(key, "/rankings", PRIORITY_LOW, response, session_factory, load)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import date as date_type
-from typing import Optional
+from typing import Optional, Literal
 
 
 class TradingResultsResponse(BaseModel):
@@ -59,4 +59,56 @@ class TradingResultsRequest(BaseModel):
     oil_id: Optional[str] = Field(None)
     delivery_type_id: Optional[str] = Field(None)
     delivery_basis_id: Optional[str] = Field(None)
-    limit: int = Field(1000, gt=0, le=1000, description="Ограничение на число записей")
\ No newline at end of file
+    limit: int = Field(1000, gt=0, le=1000, description="Ограничение на число записей")
+
+
+class TradingEventsRequest(BaseModel):
+    """
+    Схема подписки на события о новых торговых днях (SSE и WebSocket).
+
+    Фильтры по oil_id, delivery_type_id, delivery_basis_id - опциональны.
+    При with_results=true к событию прикладываются результаты торгов за даты события
+    с учётом фильтров.
+    """
+    oil_id: Optional[str] = Field(None)
+    delivery_type_id: Optional[str] = Field(None)
+    delivery_basis_id: Optional[str] = Field(None)
+    with_results: bool = Field(False, description="Прикладывать результаты торгов к событию")
+    limit: int = Field(1000, gt=0, le=1000, description="Ограничение на число записей")
+
+
+class RankingRequest(BaseModel):
+    """
+    Схема запроса рейтинга инструментов (top-N) за период.
+
+    Обязательные параметры: start_date и end_date.
+    metric - метрика ранжирования: volume, total или count (по умолчанию volume).
+    partition_by - опционально, рейтинг строится отдельно внутри каждого oil_id,
+    delivery_basis_id или delivery_type_id.
+    Фильтры по oil_id, delivery_type_id, delivery_basis_id - опциональны.
+    """
+    start_date: date_type = Field(date_type(2025, 9, 3), description="Начало периода (YYYY-MM-DD)")
+    end_date: date_type = Field(date_type(2025, 9, 4), description="Конец периода (YYYY-MM-DD)")
+    metric: Literal["volume", "total", "count"] = Field("volume", description="Метрика ранжирования")
+    partition_by: Optional[Literal["oil_id", "delivery_basis_id", "delivery_type_id"]] = Field(
+        None, description="Строить рейтинг внутри каждой группы"
+    )
+    top: int = Field(20, gt=0, le=100, description="Количество мест в рейтинге")
+    oil_id: Optional[str] = Field(None)
+    delivery_type_id: Optional[str] = Field(None)
+    delivery_basis_id: Optional[str] = Field(None)
+
+
+class RankingResponse(BaseModel):
+    """
+    Схема ответа для эндпоинта рейтинга инструментов.
+    """
+    rank: int = Field(..., description="Место в рейтинге")
+    exchange_product_id: str = Field(..., description="Код инструмента")
+    exchange_product_name: str = Field(..., description="Наименование инструмента")
+    oil_id: str = Field(..., description="Тип продукта")
+    delivery_basis_id: str = Field(..., description="Код базиса поставки")
+    delivery_type_id: str = Field(..., description="Код типа поставки")
+    volume: float = Field(..., description="Объем договоров в единицах измерения")
+    total: float = Field(..., description="Объем договоров, руб.")
+    count: int = Field(..., description="Количество договоров, шт.")
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import SNAPSHOT_DIR
+from app.models import SpimexTradingResult
+
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("exchange_product_id", pa.string()),
+    ("exchange_product_name", pa.string()),
+    ("oil_id", pa.string()),
+    ("delivery_basis_id", pa.string()),
+    ("delivery_basis_name", pa.string()),
+    ("delivery_type_id", pa.string()),
+    ("volume", pa.float64()),
+    ("total", pa.float64()),
+    ("count", pa.int64()),
+    ("date", pa.date32()),
+])
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".manifest.lock"
+
+
+class EmptySnapshot(ValueError):
+    """За торговый день нет строк: день ещё не загружен или дата указана неверно."""
+
+    def __init__(self, trading_date: date):
+        super().__init__(f"Нет результатов торгов за {trading_date.isoformat()}, снапшот не записан")
+        self.trading_date = trading_date
+
+
+def snapshot_dir() -> Path:
+    """Возвращает каталог архива снапшотов."""
+    return Path(SNAPSHOT_DIR)
+
+
+def snapshot_path(trading_date: date) -> Path:
+    """Возвращает путь к файлу снапшота торгового дня."""
+    return snapshot_dir() / f"spimex_{trading_date.isoformat()}.arrow"
+
+
+def build_table(rows: Iterable[SpimexTradingResult]) -> pa.Table:
+    """
+    Собирает Arrow-таблицу из ORM-объектов.
+    Return: pa.Table со схемой SNAPSHOT_SCHEMA.
+    """
+    columns = {name: [] for name in SNAPSHOT_SCHEMA.names}
+    for row in rows:
+        for name in SNAPSHOT_SCHEMA.names:
+            columns[name].append(getattr(row, name))
+    return pa.Table.from_pydict(columns, schema=SNAPSHOT_SCHEMA)
+
+
+def load_manifest() -> dict:
+    """
+    Читает манифест архива.
+    Return: dict вида {"YYYY-MM-DD": {"file", "rows", "size", "sha256", "created_at"}}.
+    """
+    path = snapshot_dir() / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _atomic_write(path: Path, data: bytes):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _archive_lock():
+    """
+    Межпроцессная блокировка архива на время записи снапшота и манифеста,
+    чтобы параллельные app.publish и --backfill не теряли записи манифеста.
+    """
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_NAME, "a+b") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_snapshot_file(trading_date: date, table: pa.Table, overwrite: bool = False) -> Optional[dict]:
+    """
+    Записывает снапшот торгового дня в формате Arrow IPC и обновляет манифест.
+    Снапшоты неизменяемы: существующий файл перезаписывается только при overwrite=True
+    (исправленный бюллетень).
+    Return: запись манифеста или None, если снапшот уже существует.
+    Raise: EmptySnapshot, если в таблице нет строк.
+    """
+    if not table.num_rows:
+        raise EmptySnapshot(trading_date)
+
+    sink = io.BytesIO()
+    with ipc.new_file(sink, SNAPSHOT_SCHEMA) as writer:
+        writer.write_table(table)
+    data = sink.getvalue()
+
+    path = snapshot_path(trading_date)
+    with _archive_lock():
+        if path.exists() and not overwrite:
+            return None
+        _atomic_write(path, data)
+
+        entry = {
+            "file": path.name,
+            "rows": table.num_rows,
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        manifest = load_manifest()
+        manifest[trading_date.isoformat()] = entry
+        manifest_data = json.dumps(dict(sorted(manifest.items())), ensure_ascii=False, indent=2)
+        _atomic_write(snapshot_dir() / MANIFEST_NAME, manifest_data.encode("utf-8"))
+    return entry
+
+
+async def write_snapshot(trading_date: date, db: AsyncSession, overwrite: bool = False) -> Optional[dict]:
+    """
+    Выгружает строки spimex_trading_results за торговый день в снапшот.
+    Return: запись манифеста или None, если снапшот уже существует.
+    Raise: EmptySnapshot, если за день нет строк (снапшот и запись манифеста не создаются).
+    """
+    if snapshot_path(trading_date).exists() and not overwrite:
+        return None
+    q = (
+        select(SpimexTradingResult)
+        .where(SpimexTradingResult.date == trading_date)
+        .order_by(SpimexTradingResult.id)
+    )
+    result = await db.execute(q)
+    table = build_table(result.scalars().all())
+    return await asyncio.to_thread(write_snapshot_file, trading_date, table, overwrite)
+
+
+def snapshot_dates(start_date: date, end_date: date) -> list[date]:
+    """Возвращает даты из манифеста, попадающие в период."""
+    dates = (date.fromisoformat(d) for d in load_manifest())
+    return sorted(d for d in dates if start_date <= d <= end_date)
+
+
+def iter_range_stream(dates: Iterable[date]) -> Iterator[bytes]:
+    """
+    Склеивает снапшоты нескольких дней в один поток Arrow IPC (stream format).
+    Файлы читаются через memory map, батчи пишутся в поток без преобразования.
+    Yield: bytes - очередная порция потока.
+    """
+    sink = io.BytesIO()
+    with ipc.new_stream(sink, SNAPSHOT_SCHEMA) as writer:
+        for trading_date in dates:
+            with pa.memory_map(str(snapshot_path(trading_date))) as source:
+                reader = ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    writer.write_batch(reader.get_batch(i))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+async def backfill(db: AsyncSession) -> int:
+    """
+    Создаёт снапшоты для всех торговых дат, которых ещё нет в манифесте.
+    Return: int: количество записанных снапшотов.
+    """
+    result = await db.execute(select(SpimexTradingResult.date.distinct()))
+    written = 0
+    for trading_date in sorted(r[0] for r in result.all()):
+        if await write_snapshot(trading_date, db):
+            written += 1
+    return written
+
+
+def main():
+    """
+    Заполнение архива снапшотов:
+    python -m app.snapshots --backfill
+    python -m app.snapshots 2025-09-13 [--overwrite]
+    """
+    from app.db import async_session
+
+    parser = argparse.ArgumentParser(description="Архив снапшотов торговых дней (Arrow IPC)")
+    parser.add_argument("dates", nargs="*", type=date.fromisoformat, help="Торговые даты (YYYY-MM-DD)")
+    parser.add_argument("--backfill", action="store_true", help="Создать снапшоты для всех недостающих дат")
+    parser.add_argument("--overwrite", action="store_true", help="Перезаписать существующие снапшоты")
+    args = parser.parse_args()
+
+    async def run():
+        async with async_session() as db:
+            if args.backfill:
+                await backfill(db)
+            for trading_date in args.dates:
+                await write_snapshot(trading_date, db, overwrite=args.overwrite)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
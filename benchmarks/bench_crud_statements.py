@@ -0,0 +1,76 @@
+"""
+Микробенчмарк подготовки запросов crud-слоя без обращения к БД.
+
+Сравнивает стоимость одного вызова до выполнения запроса:
+- building: запрос собирается заново цепочкой .where() на каждый вызов (как раньше);
+- prebuilt: заранее собранный запрос из results_statement с параметрами.
+В обоих случаях скомпилированный SQL берётся из кэша SQLAlchemy,
+поэтому разница - это сборка запроса и вычисление ключа кэша.
+
+Запуск из корня репозитория:
+python -m benchmarks.bench_crud_statements
+"""
+import timeit
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+from sqlalchemy.util import LRUCache
+
+from app.crud import results_statement, _filter_params
+from app.models import SpimexTradingResult
+from app.schemas import DynamicsRequest
+
+
+REQUEST = DynamicsRequest(
+    start_date=date(2025, 9, 1),
+    end_date=date(2025, 9, 30),
+    oil_id="A106",
+    delivery_basis_id="ROR",
+    limit=1000,
+)
+NUMBER = 20000
+
+dialect = asyncpg_dialect()
+compiled_cache = LRUCache(500)
+
+
+def _compile(stmt):
+    # тот же путь, что проходит Connection.execute: ключ кэша -> кэш компиляции -> параметры
+    return stmt._compile_w_cache(
+        dialect, compiled_cache=compiled_cache, column_keys=[], for_executemany=False, schema_translate_map=None,
+    )
+
+
+def building():
+    q = (
+        select(SpimexTradingResult)
+        .where(SpimexTradingResult.date >= REQUEST.start_date,
+               SpimexTradingResult.date <= REQUEST.end_date)
+        .order_by(SpimexTradingResult.date.asc())
+        .limit(REQUEST.limit)
+    )
+    if REQUEST.oil_id:
+        q = q.where(SpimexTradingResult.oil_id == REQUEST.oil_id)
+    if REQUEST.delivery_type_id:
+        q = q.where(SpimexTradingResult.delivery_type_id == REQUEST.delivery_type_id)
+    if REQUEST.delivery_basis_id:
+        q = q.where(SpimexTradingResult.delivery_basis_id == REQUEST.delivery_basis_id)
+    return _compile(q)
+
+
+def prebuilt():
+    filters, params = _filter_params(REQUEST)
+    params.update(start_date=REQUEST.start_date, end_date=REQUEST.end_date, limit=REQUEST.limit)
+    return _compile(results_statement(filters)), params
+
+
+def main():
+    for name, func in (("building", building), ("prebuilt", prebuilt)):
+        func()
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        print(f"{name:>9}: {seconds / NUMBER * 1e6:8.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
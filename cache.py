@@ -2,7 +2,7 @@ from redis.asyncio import Redis
 import json
 from datetime import datetime, timedelta
 import pytz
-from app.config import REDIS_URL, CACHE_TZ
+from app.config import REDIS_URL, CACHE_TZ, STALE_CACHE_TTL
 
 
 redis_client = Redis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
@@ -39,10 +39,40 @@ async def cache_get(key: str):
     return json.loads(raw) if raw else None
 
 
+def _stale_key(key: str) -> str:
+    return f"Spimex stale:{key}"
+
+
+async def cache_get_stale(key: str):
+    """
+    Получает последнее сохранённое значение ключа, даже если основной кэш уже истёк.
+    Используется для ответа устаревшими данными, когда БД перегружена.
+    Return: распарсенный JSON или None, если значения нет.
+    """
+    raw = await redis_client.get(_stale_key(key))
+    return json.loads(raw) if raw else None
+
+
 async def cache_set(key: str, value, expire_to_1411: bool = True):
     """
     Сохраняет данные в Redis с TTL.
     По умолчанию истекает в ближайшее 14:11, иначе через 3600 секунд (1 час).
+    Дополнительно сохраняет копию на STALE_CACHE_TTL секунд для cache_get_stale.
     """
     ttl = seconds_until_next_1411() if expire_to_1411 else 3600
-    await redis_client.set(key, json.dumps(value, ensure_ascii=False, default=str), ex=ttl)
+    payload = json.dumps(value, ensure_ascii=False, default=str)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.set(key, payload, ex=ttl)
+        pipe.set(_stale_key(key), payload, ex=STALE_CACHE_TTL)
+        await pipe.execute()
+
+
+async def cache_clear() -> int:
+    """
+    Удаляет все ключи кэша сервиса (например, после публикации нового бюллетеня).
+    Return: int: количество удалённых ключей.
+    """
+    deleted = 0
+    async for key in redis_client.scan_iter(match="Spimex cache:*"):
+        deleted += await redis_client.delete(key)
+    return deleted
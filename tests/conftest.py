@@ -8,7 +8,7 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import NullPool
 
-from app.db import get_async_db
+from app.db import get_session_factory
 from app.models import Base, SpimexTradingResult
 from app.main import app
 from cache import redis_client
@@ -45,17 +45,13 @@ async def session() -> AsyncSession:
 
 
 @pytest_asyncio.fixture
-async def client(session: AsyncSession):
+async def client():
     """
     Асинхронный HTTP клиент для тестирования FastAPI.
-    Подменяет зависимость get_async_db на тестовую сессию.
+    Подменяет зависимость get_session_factory на фабрику сессий тестовой БД.
     После завершения теста сбрасывает переопределения зависимостей.
     """
-    async def override_get_db():
-        async with session.begin():
-            yield session
-
-    app.dependency_overrides[get_async_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: async_session_test
 
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
@@ -0,0 +1,180 @@
+import pytest
+import asyncio
+
+from fastapi import Response
+
+from app.admission import PriorityLimiter, Overloaded, PRIORITY_HIGH, PRIORITY_LOW, db_limiter
+from app.crud import QueryTooExpensive
+from app.routers.events import _build_payload
+from app.routers.trading import load_admitted
+from app.schemas import TradingEventsRequest
+
+
+@pytest.mark.asyncio
+async def test_limiter_prefers_high_priority():
+    """
+    Проверяет, что освободившийся слот получает запрос с более высоким приоритетом,
+    даже если он встал в очередь позже.
+    """
+    limiter = PriorityLimiter(capacity=1, max_queue=10)
+    await limiter.acquire(PRIORITY_LOW, timeout=1)
+    order = []
+
+    async def waiter(name, priority):
+        await limiter.acquire(priority, timeout=1)
+        order.append(name)
+        limiter.release()
+
+    low = asyncio.create_task(waiter("low", PRIORITY_LOW))
+    await asyncio.sleep(0)
+    high = asyncio.create_task(waiter("high", PRIORITY_HIGH))
+    await asyncio.sleep(0)
+
+    limiter.release()
+    await asyncio.gather(low, high)
+
+    assert order == ["high", "low"]
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_when_queue_full():
+    """
+    Проверяет, что при заполненной очереди запрос сразу получает Overloaded.
+    """
+    limiter = PriorityLimiter(capacity=1, max_queue=1)
+    await limiter.acquire(PRIORITY_LOW, timeout=1)
+    queued = asyncio.create_task(limiter.acquire(PRIORITY_LOW, timeout=1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded):
+        await limiter.acquire(PRIORITY_HIGH, timeout=1)
+
+    limiter.release()
+    await queued
+    assert limiter.active == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_try_acquire():
+    """
+    Проверяет, что try_acquire занимает только свободный слот и не встаёт в очередь.
+    """
+    limiter = PriorityLimiter(capacity=1, max_queue=10)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.queued == 0
+    limiter.release()
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_wait_timeout():
+    """
+    Проверяет, что по истечении времени ожидания запрос получает Overloaded
+    и покидает очередь.
+    """
+    limiter = PriorityLimiter(capacity=1, max_queue=10)
+    await limiter.acquire(PRIORITY_LOW, timeout=1)
+
+    with pytest.raises(Overloaded):
+        await limiter.acquire(PRIORITY_HIGH, timeout=0.01)
+
+    assert limiter.queued == 0
+    limiter.release()
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_endpoint_serves_stale_when_overloaded(client, mocker):
+    """
+    Проверяет, что при перегрузке БД эндпоинт /trading/last-dates
+    отдаёт последнее сохранённое значение с заголовком X-Cache-Stale.
+    """
+    stale = {"dates": ["2025-09-13"]}
+    mocker.patch("app.routers.trading.cache_get", new_callable=mocker.AsyncMock, return_value=None)
+    mocker.patch("app.routers.trading.cache_get_stale", new_callable=mocker.AsyncMock, return_value=stale)
+    mocker.patch("app.routers.trading.admit", side_effect=Overloaded())
+
+    response = await client.get("/trading/last-dates", params={"days": 1})
+
+    assert response.status_code == 200
+    assert response.json() == stale
+    assert response.headers["X-Cache-Stale"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_endpoint_returns_503_when_overloaded(client, mocker):
+    """
+    Проверяет, что при перегрузке БД и отсутствии сохранённого значения
+    эндпоинт отвечает 503 с заголовком Retry-After.
+    """
+    mocker.patch("app.routers.trading.cache_get", new_callable=mocker.AsyncMock, return_value=None)
+    mocker.patch("app.routers.trading.cache_get_stale", new_callable=mocker.AsyncMock, return_value=None)
+    mocker.patch("app.routers.trading.admit", side_effect=Overloaded(retry_after=3))
+
+    response = await client.get("/trading/last-dates", params={"days": 1})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+
+@pytest.mark.asyncio
+async def test_load_admitted_closes_session_inside_slot(mocker):
+    """
+    Проверяет, что load_admitted закрывает сессию (возвращает соединение в пул)
+    до освобождения слота контроля нагрузки, а в Redis пишет уже после.
+    """
+    events = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            events.append(("open", db_limiter.active))
+            return self
+
+        async def __aexit__(self, *exc):
+            events.append(("close", db_limiter.active))
+
+    async def fake_cache_set(key, value):
+        events.append(("cache_set", db_limiter.active))
+
+    mocker.patch("app.routers.trading.cache_set", side_effect=fake_cache_set)
+    active = db_limiter.active
+
+    async def loader(db):
+        return {"dates": []}
+
+    result = await load_admitted("key", "/last-dates", PRIORITY_HIGH, Response(), FakeSession, loader)
+
+    assert result == {"dates": []}
+    assert events == [("open", active + 1), ("close", active + 1), ("cache_set", active)]
+
+
+@pytest.mark.asyncio
+async def test_event_payload_reports_overload(mocker):
+    """
+    Проверяет, что при перегрузке БД событие уходит без results,
+    но с results_error и подсказкой retry_after.
+    """
+    mocker.patch("app.routers.events._results_for_event", side_effect=Overloaded(retry_after=3))
+    event = {"event": "published", "dates": ["2025-09-13"]}
+
+    payload = await _build_payload(event, TradingEventsRequest(with_results=True))
+
+    assert "results" not in payload
+    assert payload["results_error"]["retry_after"] == 3
+
+
+@pytest.mark.asyncio
+async def test_event_payload_reports_too_expensive(mocker):
+    """
+    Проверяет, что отклонённый планировщиком запрос не обрывает подписку:
+    событие уходит с results_error без подсказки retry_after.
+    """
+    mocker.patch("app.routers.events._results_for_event", side_effect=QueryTooExpensive(5000))
+    event = {"event": "published", "dates": ["2025-09-13"]}
+
+    payload = await _build_payload(event, TradingEventsRequest(with_results=True))
+
+    assert "results" not in payload
+    assert payload["results_error"] == {"detail": str(QueryTooExpensive(5000))}
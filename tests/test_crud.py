@@ -1,8 +1,15 @@
 import pytest
+import asyncio
 from datetime import date
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from app.crud import get_last_trading_dates, get_dynamics, get_trading_results
-from app.schemas import DynamicsRequest, TradingResultsRequest
+from app.crud import (
+    get_last_trading_dates, get_dynamics, get_trading_results, get_rankings, refresh_daily_totals,
+    refresh_trading_day, plan_dynamics, QueryTooExpensive, results_statement,
+)
+from app.admission import PriorityLimiter
+from app.schemas import DynamicsRequest, TradingResultsRequest, RankingRequest
 
 
 @pytest.mark.asyncio
@@ -50,3 +57,163 @@ async def test_get_trading_results(session, sample_trading_results):
     )
     result = await get_trading_results(request, session)
     assert len(result) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_rankings(session, sample_trading_results):
+    """
+    Проверяет функцию get_rankings:
+    1. Ранжирует инструменты по метрике за период.
+    2. Возвращает тот же рейтинг, когда часть дней берётся из предрассчитанных сумм.
+    """
+    await session.execute(text("TRUNCATE spimex_daily_product_totals;"))
+    request = RankingRequest(
+        start_date=date(2025, 9, 12),
+        end_date=date(2025, 9, 13),
+        metric="volume",
+        top=10
+    )
+    result = await get_rankings(request, session)
+    assert [(r["rank"], r["exchange_product_id"]) for r in result] == [(1, "A10KZLY060W"), (2, "A106ROR005A")]
+
+    await refresh_daily_totals(date(2025, 9, 12), session)
+    merged = await get_rankings(request, session)
+    assert [dict(r) for r in merged] == [dict(r) for r in result]
+
+
+def test_plan_dynamics(monkeypatch):
+    """
+    Проверяет функцию plan_dynamics:
+    1. Без фильтров сужает период до первых дней, которых хватает на limit.
+    2. С фильтрами делит широкий период на календарные месяцы, в которых есть строки.
+    3. С фильтрами отклоняет запрос, если оценка превышает DYNAMICS_MAX_ROWS.
+    """
+    monkeypatch.setattr("app.crud.DYNAMICS_SPLIT_ROWS", 100)
+    monkeypatch.setattr("app.crud.DYNAMICS_MAX_ROWS", 1000)
+    day_rows = [(date(2025, 1, 10), 60), (date(2025, 2, 10), 60), (date(2025, 3, 10), 60)]
+
+    request = DynamicsRequest(start_date=date(2025, 1, 1), end_date=date(2025, 3, 15), limit=100)
+    assert plan_dynamics(request, day_rows) == [(date(2025, 1, 1), date(2025, 2, 10))]
+
+    request = DynamicsRequest(start_date=date(2025, 1, 5), end_date=date(2025, 3, 15), oil_id="A106", limit=100)
+    assert plan_dynamics(request, day_rows) == [
+        (date(2025, 1, 5), date(2025, 1, 31)),
+        (date(2025, 2, 1), date(2025, 2, 28)),
+        (date(2025, 3, 1), date(2025, 3, 15)),
+    ]
+
+    request = DynamicsRequest(start_date=date(2000, 1, 1), end_date=date(2025, 6, 30), oil_id="A106", limit=100)
+    assert plan_dynamics(request, day_rows) == [
+        (date(2025, 1, 1), date(2025, 1, 31)),
+        (date(2025, 2, 1), date(2025, 2, 28)),
+        (date(2025, 3, 1), date(2025, 6, 30)),
+    ]
+
+    with pytest.raises(QueryTooExpensive):
+        plan_dynamics(request, day_rows + [(date(2025, 3, 11), 1000)])
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_split(session, sample_trading_results, monkeypatch):
+    """
+    Проверяет, что get_dynamics с помесячными подзапросами в отдельных сессиях
+    возвращает те же строки, что и один запрос за период.
+    """
+    monkeypatch.setattr("app.crud.DYNAMICS_SPLIT_ROWS", 0)
+    await session.execute(text("TRUNCATE spimex_trading_days;"))
+    for row in sample_trading_results:
+        await refresh_trading_day(row.date, session)
+
+    request = DynamicsRequest(
+        start_date=date(2025, 8, 1),
+        end_date=date(2025, 9, 30),
+        delivery_basis_id="ZLY",
+        limit=10
+    )
+    session_factory = async_sessionmaker(bind=session.bind, expire_on_commit=False)
+    result = await get_dynamics(request, session, session_factory)
+    assert [r.exchange_product_id for r in result] == ["A10KZLY060W"]
+
+
+def test_results_statement_is_prebuilt():
+    """
+    Проверяет, что results_statement возвращает один и тот же заранее собранный запрос
+    для одного набора фильтров и разные запросы для разных наборов.
+    """
+    assert results_statement(("oil_id",)) is results_statement(("oil_id",))
+    assert results_statement(("oil_id",)) is not results_statement(("oil_id",), descending=True)
+    assert results_statement(()) is not results_statement(("oil_id",))
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_split_charges_db_slots(mocker, monkeypatch):
+    """
+    Проверяет, что помесячные подзапросы get_dynamics:
+    1. Возвращают соединение внешней сессии в пул до запуска волн.
+    2. Занимают слот db_limiter на каждый дополнительный параллельный подзапрос
+       и выполняются не шире числа свободных слотов.
+    3. Освобождают дополнительные слоты после выполнения.
+    """
+    limiter = PriorityLimiter(capacity=2, max_queue=1)
+    await limiter.acquire(0, timeout=1)  # слот самого запроса (admit)
+    monkeypatch.setattr("app.crud.db_limiter", limiter)
+    monkeypatch.setattr("app.crud.DYNAMICS_PARALLELISM", 3)
+    mocker.patch("app.crud.get_day_rows", return_value=[])
+    ranges = [(date(2025, month, 1), date(2025, month, 28)) for month in range(1, 5)]
+    mocker.patch("app.crud.plan_dynamics", return_value=ranges)
+
+    running, peak = 0, 0
+
+    async def fake_fetch(request, start_date, end_date, limit, session_factory):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+        return [start_date]
+
+    mocker.patch("app.crud._fetch_dynamics_in_session", side_effect=fake_fetch)
+    db = mocker.AsyncMock()
+
+    request = DynamicsRequest(start_date=date(2025, 1, 1), end_date=date(2025, 4, 28), oil_id="A106", limit=10)
+    result = await get_dynamics(request, db, mocker.Mock())
+
+    assert result == [start_date for start_date, _ in ranges]
+    db.close.assert_awaited_once()
+    assert peak == 2
+    assert limiter.active == 1
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_split_cancels_wave_on_error(mocker, monkeypatch):
+    """
+    Проверяет, что при ошибке подзапроса остальные подзапросы волны отменяются
+    до освобождения слотов db_limiter, а наружу выходит исходное исключение.
+    """
+    limiter = PriorityLimiter(capacity=2, max_queue=1)
+    await limiter.acquire(0, timeout=1)  # слот самого запроса (admit)
+    monkeypatch.setattr("app.crud.db_limiter", limiter)
+    monkeypatch.setattr("app.crud.DYNAMICS_PARALLELISM", 2)
+    mocker.patch("app.crud.get_day_rows", return_value=[])
+    ranges = [(date(2025, month, 1), date(2025, month, 28)) for month in range(1, 3)]
+    mocker.patch("app.crud.plan_dynamics", return_value=ranges)
+
+    cancelled_with_slots = []
+
+    async def fake_fetch(request, start_date, end_date, limit, session_factory):
+        if start_date.month == 1:
+            raise ConnectionError("connection lost")
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled_with_slots.append(limiter.active)
+            raise
+
+    mocker.patch("app.crud._fetch_dynamics_in_session", side_effect=fake_fetch)
+
+    request = DynamicsRequest(start_date=date(2025, 1, 1), end_date=date(2025, 2, 28), oil_id="A106", limit=10)
+    with pytest.raises(ConnectionError):
+        await get_dynamics(request, mocker.AsyncMock(), mocker.Mock())
+
+    assert cancelled_with_slots == [2]
+    assert limiter.active == 1
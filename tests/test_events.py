@@ -0,0 +1,134 @@
+import pytest
+import asyncio
+import json
+from datetime import date
+
+from app.broadcast import Broadcaster, publish_trading_dates, EVENTS_CHANNEL
+from app.routers.events import _build_payload
+from app.schemas import TradingEventsRequest
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_dispatch_fan_out():
+    """
+    Проверяет, что одно событие попадает в очередь каждого подписчика,
+    а после отключения подписчик больше не получает события.
+    """
+    broadcaster = Broadcaster()
+    event = {"event": "published", "dates": ["2025-09-13"]}
+
+    async with broadcaster.subscribe() as first:
+        async with broadcaster.subscribe() as second:
+            broadcaster.dispatch(event)
+            assert await first.get() == event
+            assert await second.get() == event
+        broadcaster.dispatch(event)
+        assert first.qsize() == 1
+        assert second.qsize() == 0
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_drops_oldest_for_slow_subscriber():
+    """
+    Проверяет, что переполненная очередь медленного клиента
+    вытесняет самое старое событие, а не блокирует рассылку.
+    """
+    broadcaster = Broadcaster(queue_size=2)
+
+    async with broadcaster.subscribe() as queue:
+        for day in (1, 2, 3):
+            broadcaster.dispatch({"event": "published", "dates": [f"2025-09-0{day}"]})
+        assert (await queue.get())["dates"] == ["2025-09-02"]
+        assert (await queue.get())["dates"] == ["2025-09-03"]
+
+
+@pytest.mark.asyncio
+async def test_publish_trading_dates(mocker):
+    """
+    Проверяет, что publish_trading_dates отправляет в канал Redis
+    JSON-событие с отсортированными датами.
+    """
+    publish = mocker.patch("app.broadcast.redis_client.publish", new_callable=mocker.AsyncMock, return_value=1)
+
+    await publish_trading_dates([date(2025, 9, 13), date(2025, 9, 12)], revised=True)
+
+    channel, payload = publish.call_args.args
+    assert channel == EVENTS_CHANNEL
+    assert json.loads(payload) == {"event": "revised", "dates": ["2025-09-12", "2025-09-13"]}
+
+
+class FakePubSub:
+    """
+    Заглушка Redis pub/sub: падает при подписке или отдаёт заданные сообщения.
+    """
+    def __init__(self, messages=(), fail=False):
+        self.messages = messages
+        self.fail = fail
+
+    async def subscribe(self, channel):
+        if self.fail:
+            raise ConnectionError("Redis is down")
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_reconnects(mocker, monkeypatch):
+    """
+    Проверяет, что после ошибки подписки Broadcaster переподключается
+    и продолжает рассылать события.
+    """
+    monkeypatch.setattr("app.broadcast.RECONNECT_MIN_DELAY", 0)
+    event = {"event": "published", "dates": ["2025-09-13"]}
+    mocker.patch("app.broadcast.redis_client.pubsub", side_effect=[
+        FakePubSub(fail=True),
+        FakePubSub(messages=[{"type": "message", "data": json.dumps(event)}]),
+    ])
+    broadcaster = Broadcaster()
+
+    async with broadcaster.subscribe() as queue:
+        await broadcaster.start()
+        try:
+            assert await asyncio.wait_for(queue.get(), timeout=1) == event
+        finally:
+            await broadcaster.stop()
+
+
+@pytest.mark.asyncio
+async def test_event_results_loaded_per_date(mocker):
+    """
+    Проверяет, что результаты исправления с разнесёнными датами загружаются
+    отдельным запросом на каждую дату, и limit не отсекает поздние даты.
+    """
+    async def fake_load(request, key):
+        assert request.start_date == request.end_date
+        return [{"date": request.start_date.isoformat()}] * request.limit, False
+
+    load = mocker.patch("app.routers.events._load_results", side_effect=fake_load)
+    event = {"event": "revised", "dates": ["2025-09-13", "2024-01-10"]}
+
+    payload = await _build_payload(event, TradingEventsRequest(with_results=True, limit=1))
+
+    assert load.call_count == 2
+    assert payload["results"] == [{"date": "2024-01-10"}, {"date": "2025-09-13"}]
+
+
+@pytest.mark.asyncio
+async def test_event_payload_reports_load_error(mocker):
+    """
+    Проверяет, что ошибка загрузки результатов не обрывает подписку:
+    событие уходит с results_error вместо results.
+    """
+    mocker.patch("app.routers.events._load_results", side_effect=ConnectionError("db is down"))
+    event = {"event": "published", "dates": ["2025-09-13"]}
+
+    payload = await _build_payload(event, TradingEventsRequest(with_results=True))
+
+    assert "results" not in payload
+    assert "retry_after" not in payload["results_error"]
@@ -0,0 +1,77 @@
+import pytest
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow.ipc as ipc
+from datetime import date
+
+from app.snapshots import (
+    build_table, write_snapshot, write_snapshot_file, load_manifest, snapshot_path, iter_range_stream,
+    EmptySnapshot,
+)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    """
+    Фикстура перенаправляет архив снапшотов во временный каталог.
+    """
+    monkeypatch.setattr("app.snapshots.SNAPSHOT_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_write_snapshot(session, sample_trading_results, snapshot_dir):
+    """
+    Проверяет функцию write_snapshot:
+    1. Записывает файл дня, который читается через memory map.
+    2. Добавляет запись о дне в манифест.
+    3. Не перезаписывает существующий снапшот без overwrite.
+    """
+    trading_date = sample_trading_results[0].date
+    entry = await write_snapshot(trading_date, session)
+
+    table = ipc.open_file(pa.memory_map(str(snapshot_path(trading_date)))).read_all()
+    assert table.num_rows == 1
+    assert table.column("exchange_product_id").to_pylist() == ["A106ROR005A"]
+    assert load_manifest()[trading_date.isoformat()] == entry
+
+    assert await write_snapshot(trading_date, session) is None
+
+
+@pytest.mark.asyncio
+async def test_iter_range_stream(snapshot_dir, sample_trading_results):
+    """
+    Проверяет, что снапшоты нескольких дней склеиваются в один поток Arrow IPC.
+    """
+    for row in sample_trading_results:
+        write_snapshot_file(row.date, build_table([row]))
+
+    data = b"".join(iter_range_stream([date(2025, 9, 12), date(2025, 9, 13)]))
+    table = ipc.open_stream(data).read_all()
+
+    assert table.num_rows == 2
+    assert table.column("date").to_pylist() == [date(2025, 9, 12), date(2025, 9, 13)]
+
+
+def test_write_snapshot_file_rejects_empty_day(snapshot_dir):
+    """
+    Проверяет, что за день без строк снапшот и запись манифеста не создаются.
+    """
+    with pytest.raises(EmptySnapshot):
+        write_snapshot_file(date(2025, 9, 14), build_table([]))
+
+    assert not snapshot_path(date(2025, 9, 14)).exists()
+    assert load_manifest() == {}
+
+
+@pytest.mark.asyncio
+async def test_write_snapshot_file_concurrent_manifest(snapshot_dir, sample_trading_results):
+    """
+    Проверяет, что параллельная запись снапшотов разных дней не теряет записи манифеста.
+    """
+    row = sample_trading_results[0]
+    dates = [date(2025, 8, day) for day in range(1, 29)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda d: write_snapshot_file(d, build_table([row])), dates))
+
+    assert sorted(load_manifest()) == [d.isoformat() for d in dates]
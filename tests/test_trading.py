@@ -43,3 +43,21 @@ async def test_trading_results_endpoint(client, sample_trading_results):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 1
+
+
+@pytest.mark.asyncio
+async def test_rankings_endpoint(client, sample_trading_results):
+    """
+    Проверяет, что эндпоинт /trading/rankings возвращает top-N инструментов по total.
+    """
+    params = {
+        "start_date": date(2025, 9, 12),
+        "end_date": date(2025, 9, 13),
+        "metric": "total",
+        "top": 1
+    }
+    response = await client.get("/trading/rankings", params=params)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["exchange_product_id"] == "A10KZLY060W"